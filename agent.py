@@ -1,7 +1,11 @@
 """Agent logic - Core reasoning and decision-making system."""
 
 import os
-from typing import Dict, Any, List, Optional
+import re
+import asyncio
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, AsyncIterator
 from enum import Enum
 
 from memory import ConversationMemory
@@ -9,6 +13,15 @@ from tools import ToolRegistry
 from rag import RAGPipeline
 
 
+# Maximum number of tool calls executed concurrently by a single agent
+TOOL_CONCURRENCY_LIMIT = 8
+
+_TOOL_RE = re.compile(r"\[TOOL_CALL\]\s*([^\s:\[]+)\s*(?::(.*?))?\[/TOOL_CALL\]", re.DOTALL)
+_PARAM_RE = re.compile(r"(\w+)\s*=([^,]*)")
+# Streamed token deltas; leading whitespace rides on the first token so deltas join to the response
+_TOKEN_DELTA_RE = re.compile(r"\s*\S+\s*")
+
+
 class AgentState(str, Enum):
     """Agent execution states."""
     IDLE = "idle"
@@ -42,6 +55,9 @@ class Agent:
         self.max_iterations = 10
         self.temperature = 0.7
         self.system_prompt = self._build_system_prompt()
+        
+        # Shared pool for running independent tool calls concurrently
+        self._pool = ThreadPoolExecutor(max_workers=TOOL_CONCURRENCY_LIMIT)
     
     def _build_system_prompt(self) -> str:
         """Build the system prompt for the agent."""
@@ -63,9 +79,14 @@ class Agent:
     def register_tool(self, tool) -> None:
         """Register a tool with the agent."""
         self.tool_registry.register(tool)
+        # The prompt lists tool names, so it only changes on registration
+        self.system_prompt = self._build_system_prompt()
     
-    def _prepare_context(self, query: str) -> str:
-        """Prepare context for the LLM including memory and RAG."""
+    def _prepare_context(self, query: str, rag_context: Optional[str] = None) -> str:
+        """
+        Prepare context for the LLM including memory and RAG.
+        rag_context is used when retrieval was already started by the caller.
+        """
         context_parts = []
         
         # Add memory context
@@ -75,7 +96,9 @@ class Agent:
                 context_parts.append(f"Conversation History:\n{history}\n")
         
         # Add RAG context
-        if self.rag_pipeline:
+        if rag_context is not None:
+            context_parts.append(rag_context)
+        elif self.rag_pipeline:
             context = self.rag_pipeline.augment_prompt(query)
             context_parts.append(context)
         
@@ -86,85 +109,148 @@ class Agent:
         
         return "\n".join(context_parts)
     
-    def _parse_tool_call(self, response: str) -> Optional[Dict[str, Any]]:
+    def _parse_tool_calls(self, response: str) -> List[Dict[str, Any]]:
         """
-        Parse tool calls from model response.
+        Parse all tool calls from model response.
         Expected format: [TOOL_CALL] tool_name: param1=value1, param2=value2 [/TOOL_CALL]
+        Multiple [TOOL_CALL] blocks may appear and are returned in order.
         """
         if "[TOOL_CALL]" not in response:
-            return None
+            return []
         
-        try:
-            start = response.find("[TOOL_CALL]") + len("[TOOL_CALL]")
-            end = response.find("[/TOOL_CALL]")
-            tool_section = response[start:end].strip()
-            
-            # Parse tool name and parameters
-            parts = tool_section.split(":", 1)
-            tool_name = parts[0].strip()
-            
-            params = {}
-            if len(parts) > 1:
-                param_str = parts[1].strip()
-                for param in param_str.split(","):
-                    if "=" in param:
-                        k, v = param.split("=", 1)
-                        params[k.strip()] = v.strip()
-            
-            return {
-                "tool": tool_name,
-                "params": params
+        return [
+            {
+                "tool": match.group(1),
+                "params": {k: v.strip() for k, v in _PARAM_RE.findall(match.group(2) or "")}
             }
-        except Exception:
-            return None
+            for match in _TOOL_RE.finditer(response)
+        ]
     
     def execute_tool(self, tool_name: str, **kwargs) -> str:
         """Execute a tool and return results."""
         try:
-            self.state = AgentState.EXECUTING
-            result = self.tool_registry.execute_tool(tool_name, **kwargs)
-            self.state = AgentState.IDLE
-            return str(result)
+            return self._run_tool(tool_name, **kwargs)
         except Exception as e:
             self.state = AgentState.ERROR
             return f"Tool execution error: {str(e)}"
     
-    def think(self, query: str, max_iterations: int = None) -> str:
+    def _run_tool(self, tool_name: str, **kwargs) -> str:
+        """Execute a tool, letting failures propagate to the caller."""
+        self.state = AgentState.EXECUTING
+        result = self.tool_registry.execute_tool(tool_name, **kwargs)
+        self.state = AgentState.IDLE
+        return str(result)
+    
+    async def _execute_tool_async(self, tool_name: str, **kwargs) -> str:
+        """Execute a tool on the agent's thread pool without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._pool,
+            partial(self._run_tool, tool_name, **kwargs)
+        )
+    
+    async def think(self, query: str, max_iterations: int = None) -> str:
         """Main reasoning loop."""
+        response = ""
+        async for event in self.think_stream(query, max_iterations):
+            if event["event"] == "final":
+                response = event["response"]
+        return response
+    
+    async def think_stream(self, query: str, max_iterations: int = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Main reasoning loop, yielding progress events as they happen.
+        Events: tool_start, tool_end, token and a closing final event.
+        """
         if max_iterations is None:
             max_iterations = self.max_iterations
         
         self.state = AgentState.THINKING
         
+        # Start retrieval first so it overlaps with the rest of context preparation
+        retrieval_task = None
+        if self.rag_pipeline:
+            retrieval_task = asyncio.ensure_future(
+                self.rag_pipeline.augment_prompt_async(query, executor=self._pool)
+            )
+        
         # Add user message to memory
         if self.memory:
             self.memory.add_message("user", query)
         
-        # Prepare context
-        context = self._prepare_context(query)
-        
-        # Simulate reasoning (in production, this would call an LLM)
-        response = self._generate_response(context, query)
-        
-        # Check for tool calls
-        for _ in range(max_iterations):
-            tool_call = self._parse_tool_call(response)
-            if tool_call:
-                tool_result = self.execute_tool(
-                    tool_call["tool"],
-                    **tool_call["params"]
+        # A disconnected stream closes this generator at a yield; the finally below
+        # then settles outstanding tool tasks and leaves memory and state consistent
+        response = ""
+        tasks: List[asyncio.Future] = []
+        finished = False
+        try:
+            # Prepare context
+            rag_context = await retrieval_task if retrieval_task else None
+            context = self._prepare_context(query, rag_context)
+            
+            # Simulate reasoning (in production, this would call an LLM)
+            response = self._generate_response(context, query)
+            
+            # Check for tool calls
+            for _ in range(max_iterations):
+                tool_calls = self._parse_tool_calls(response)
+                if not tool_calls:
+                    break
+            
+                # Independent tool calls run concurrently; results keep call order
+                tasks[:] = [
+                    asyncio.ensure_future(self._execute_tool_async(c["tool"], **c["params"]))
+                    for c in tool_calls
+                ]
+                for index, call in enumerate(tool_calls):
+                    yield {"event": "tool_start", "index": index, "tool": call["tool"], "status": "pending"}
+            
+                results: List[Optional[str]] = [None] * len(tasks)
+                pending = {task: index for index, task in enumerate(tasks)}
+                while pending:
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        index = pending.pop(task)
+                        error = task.exception()
+                        results[index] = f"Tool execution error: {error}" if error else task.result()
+                        yield {
+                            "event": "tool_end",
+                            "index": index,
+                            "tool": tool_calls[index]["tool"],
+                            "status": "error" if error else "done",
+                            "result": results[index]
+                        }
+            
+                tool_result = "\n".join(
+                    f"{call['tool']}: {result}" for call, result in zip(tool_calls, results)
                 )
                 # In production, feed tool result back to LLM for refinement
                 response = self._continue_reasoning(response, tool_result)
-            else:
-                break
-        
-        # Add assistant response to memory
-        if self.memory:
-            self.memory.add_message("assistant", response)
+            
+            # In production, forward token deltas from the LLM as they arrive
+            for token in _TOKEN_DELTA_RE.findall(response):
+                yield {"event": "token", "delta": token}
+            
+            # Add assistant response to memory
+            if self.memory:
+                self.memory.add_message("assistant", response)
+            
+            self.state = AgentState.COMPLETE
+            finished = True
+        finally:
+            if not finished:
+                for task in tasks:
+                    if not task.done():
+                        task.cancel()
+                    elif not task.cancelled():
+                        # Mark the outcome as retrieved so asyncio does not log it
+                        task.exception()
+                # Keep the user turn paired with whatever response was produced
+                if self.memory and response:
+                    self.memory.add_message("assistant", response)
+                self.state = AgentState.IDLE
         
-        self.state = AgentState.COMPLETE
-        return response
+        yield {"event": "final", "response": response, "state": self.state.value}
     
     def _generate_response(self, context: str, query: str) -> str:
         """Generate response (placeholder - implement LLM integration)."""
@@ -198,3 +284,7 @@ class Agent:
         self.state = AgentState.IDLE
         if self.memory:
             self.memory.clear()
+    
+    def shutdown(self) -> None:
+        """Release the tool execution pool."""
+        self._pool.shutdown(wait=False)
@@ -1,10 +1,24 @@
 """Knowledge ingestion system for populating the RAG vector store."""
 
 import os
-import json
-from typing import List, Dict, Any
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterable, Tuple, Optional
 from pathlib import Path
 
+import aiofiles
+import orjson
+
+
+# Number of documents buffered before they are added to the vector store
+BATCH_SIZE = 256
+
+# Worker threads used to read files concurrently during directory ingestion
+READ_WORKERS = 8
+
+# Files open at once during async directory ingestion
+ASYNC_READ_CONCURRENCY = 32
+
 
 class DocumentProcessor:
     """Process and prepare documents for ingestion."""
@@ -12,10 +26,15 @@ class DocumentProcessor:
     @staticmethod
     def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]:
         """Split text into overlapping chunks."""
+        step = chunk_size - overlap
+        if step <= 0:
+            raise ValueError("chunk_size must be greater than overlap")
+        
         chunks = []
-        for i in range(0, len(text), chunk_size - overlap):
+        for i in range(0, len(text), step):
             chunk = text[i:i + chunk_size]
-            if chunk.strip():
+            # isspace() answers the same question as strip() without copying the slice
+            if not chunk.isspace():
                 chunks.append(chunk)
         return chunks
     
@@ -25,11 +44,16 @@ class DocumentProcessor:
         with open(file_path, 'r', encoding='utf-8') as f:
             content = f.read()
         
-        chunks = DocumentProcessor.chunk_text(content)
+        return DocumentProcessor.parse_text(content, file_path)
+    
+    @staticmethod
+    def parse_text(content: str, source: str, chunk: bool = True) -> List[Dict[str, Any]]:
+        """Turn text content into documents, optionally chunked."""
+        chunks = DocumentProcessor.chunk_text(content) if chunk else [content]
         return [
             {
                 "content": chunk,
-                "source": file_path,
+                "source": source,
                 "type": "text"
             }
             for chunk in chunks
@@ -38,8 +62,13 @@ class DocumentProcessor:
     @staticmethod
     def process_json_file(file_path: str) -> List[Dict[str, Any]]:
         """Process a JSON file into documents."""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        with open(file_path, 'rb') as f:
+            return DocumentProcessor.parse_json(f.read(), file_path)
+    
+    @staticmethod
+    def parse_json(raw: bytes, source: str) -> List[Dict[str, Any]]:
+        """Turn raw JSON bytes into documents."""
+        data = orjson.loads(raw)
         
         documents = []
         if isinstance(data, list):
@@ -50,7 +79,7 @@ class DocumentProcessor:
         # Ensure each document has content
         for doc in documents:
             if "source" not in doc:
-                doc["source"] = file_path
+                doc["source"] = source
         
         return documents
 
@@ -62,46 +91,79 @@ class KnowledgeIngester:
         self.rag_pipeline = rag_pipeline
         self.ingestion_log: List[Dict[str, Any]] = []
     
-    def ingest_file(self, file_path: str, chunk: bool = True) -> int:
-        """Ingest a single file."""
+    def _load_documents(self, file_path: str, chunk: bool = True) -> List[Dict[str, Any]]:
+        """Read a file into documents without adding them to the pipeline."""
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
         
+        self._check_file_type(file_path)
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+        return self._parse_documents(file_path, raw, chunk)
+    
+    @staticmethod
+    def _check_file_type(file_path: str) -> str:
+        """Return the file extension, rejecting unsupported types before any read."""
         _, ext = os.path.splitext(file_path)
-        documents = []
-        
-        if ext == '.txt':
-            if chunk:
-                documents = DocumentProcessor.process_txt_file(file_path)
-            else:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                documents = [{
-                    "content": content,
-                    "source": file_path,
-                    "type": "text"
-                }]
-        
-        elif ext == '.json':
-            documents = DocumentProcessor.process_json_file(file_path)
-        
-        else:
+        if ext not in ('.txt', '.json'):
             raise ValueError(f"Unsupported file type: {ext}")
+        return ext
+    
+    def _parse_documents(self, file_path: str, raw: bytes, chunk: bool = True) -> List[Dict[str, Any]]:
+        """Parse raw file contents into documents."""
+        if self._check_file_type(file_path) == '.txt':
+            # Match text-mode open(): universal newlines
+            content = raw.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+            return DocumentProcessor.parse_text(content, file_path, chunk=chunk)
+        return DocumentProcessor.parse_json(raw, file_path)
+    
+    async def _load_documents_async(
+        self,
+        file_path: str,
+        sem: asyncio.Semaphore,
+        chunk: bool = True
+    ) -> List[Dict[str, Any]]:
+        """Read a file without blocking the event loop, then parse it on a worker thread."""
+        self._check_file_type(file_path)
+        async with sem:
+            async with aiofiles.open(file_path, 'rb') as f:
+                raw = await f.read()
         
-        # Add to RAG pipeline if available
-        if self.rag_pipeline:
-            for doc in documents:
-                content = doc.get("content") or doc.get("text", "")
-                metadata = {k: v for k, v in doc.items() if k != "content"}
-                if content:
-                    self.rag_pipeline.vector_store.add_document(content, metadata)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._parse_documents, file_path, raw, chunk)
+    
+    def _add_documents(self, documents: List[Dict[str, Any]]) -> None:
+        """Add documents to the RAG pipeline in a single batch."""
+        if not self.rag_pipeline:
+            return
         
-        # Log ingestion
+        contents, metadatas = [], []
+        for doc in documents:
+            content = doc.get("content") or doc.get("text", "")
+            if content:
+                contents.append(content)
+                metadatas.append({k: v for k, v in doc.items() if k != "content"})
+        
+        if contents:
+            self.rag_pipeline.vector_store.add_documents(contents, metadatas)
+    
+    def _log_ingestion(self, file_path: str, documents: List[Dict[str, Any]]) -> None:
+        """Record an ingested file."""
         self.ingestion_log.append({
             "file": file_path,
             "documents_added": len(documents),
-            "type": ext
+            "type": os.path.splitext(file_path)[1]
         })
+    
+    def ingest_file(self, file_path: str, chunk: bool = True) -> int:
+        """Ingest a single file."""
+        documents = self._load_documents(file_path, chunk=chunk)
+        
+        # Add to RAG pipeline if available
+        self._add_documents(documents)
+        
+        # Log ingestion
+        self._log_ingestion(file_path, documents)
         
         return len(documents)
     
@@ -110,27 +172,82 @@ class KnowledgeIngester:
         if not os.path.isdir(dir_path):
             raise NotADirectoryError(f"Not a directory: {dir_path}")
         
+        file_paths = [p for p in Path(dir_path).glob(pattern) if p.is_file()]
+        
+        # Files are read concurrently; documents are added in order, in batches
+        with ThreadPoolExecutor(max_workers=READ_WORKERS) as pool:
+            futures = [
+                pool.submit(self._load_documents, str(file_path), chunk)
+                for file_path in file_paths
+            ]
+            
+            def outcomes():
+                for file_path, future in zip(file_paths, futures):
+                    try:
+                        yield file_path, future.result(), None
+                    except Exception as e:
+                        yield file_path, None, e
+            
+            return self._collect_results(outcomes())
+    
+    async def ingest_directory_async(
+        self,
+        dir_path: str,
+        pattern: str = "*",
+        chunk: bool = True,
+        concurrency: int = ASYNC_READ_CONCURRENCY
+    ) -> Dict[str, Any]:
+        """Ingest all files in a directory, reading up to `concurrency` files at once."""
+        if not os.path.isdir(dir_path):
+            raise NotADirectoryError(f"Not a directory: {dir_path}")
+        
+        file_paths = [p for p in Path(dir_path).glob(pattern) if p.is_file()]
+        sem = asyncio.Semaphore(concurrency)
+        loaded = await asyncio.gather(
+            *[self._load_documents_async(str(p), sem, chunk) for p in file_paths],
+            return_exceptions=True
+        )
+        
+        return self._collect_results(
+            (file_path, None, result) if isinstance(result, Exception) else (file_path, result, None)
+            for file_path, result in zip(file_paths, loaded)
+        )
+    
+    def _collect_results(
+        self,
+        outcomes: Iterable[Tuple[Path, Optional[List[Dict[str, Any]]], Optional[Exception]]]
+    ) -> Dict[str, Any]:
+        """Add loaded files to the pipeline in order and summarize the ingestion."""
         results = {
             "total_files": 0,
             "total_documents": 0,
             "files": []
         }
+        batch: List[Dict[str, Any]] = []
+        
+        for file_path, documents, error in outcomes:
+            if error is not None:
+                results["files"].append({
+                    "name": file_path.name,
+                    "error": str(error)
+                })
+                continue
+            
+            batch.extend(documents)
+            if len(batch) >= BATCH_SIZE:
+                self._add_documents(batch)
+                batch = []
+            
+            self._log_ingestion(str(file_path), documents)
+            results["files"].append({
+                "name": file_path.name,
+                "documents": len(documents)
+            })
+            results["total_documents"] += len(documents)
+            results["total_files"] += 1
         
-        for file_path in Path(dir_path).glob(pattern):
-            if file_path.is_file():
-                try:
-                    doc_count = self.ingest_file(str(file_path), chunk=chunk)
-                    results["files"].append({
-                        "name": file_path.name,
-                        "documents": doc_count
-                    })
-                    results["total_documents"] += doc_count
-                    results["total_files"] += 1
-                except Exception as e:
-                    results["files"].append({
-                        "name": file_path.name,
-                        "error": str(e)
-                    })
+        if batch:
+            self._add_documents(batch)
         
         return results
     
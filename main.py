@@ -1,12 +1,18 @@
 """FastAPI application entry point for the AI Agent."""
 
 import os
+import ast
+import asyncio
+import operator
+from functools import lru_cache, partial
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 from typing import Optional, Dict, Any
 
 from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
+import orjson
 import uvicorn
 
 from agent import Agent
@@ -45,6 +51,62 @@ class ToolCallRequest(BaseModel):
 agent: Optional[Agent] = None
 ingester: Optional[KnowledgeIngester] = None
 
+# Worker threads for blocking calls made from request handlers
+BLOCKING_POOL_SIZE = 32
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking call on the app thread pool so the event loop stays free."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(app.state.pool, partial(func, *args, **kwargs))
+
+
+# Largest integer power the calculator will compute, in bits
+MAX_POWER_BITS = 4096
+
+
+def _power(base, exponent):
+    """operator.pow with a size cap, so a huge integer power cannot stall the server."""
+    if (
+        isinstance(base, int) and isinstance(exponent, int)
+        and abs(base) > 1 and exponent * base.bit_length() > MAX_POWER_BITS
+    ):
+        raise ValueError(f"Result of {base}**{exponent} is too large")
+    return operator.pow(base, exponent)
+
+
+# Arithmetic allowed in calculator expressions
+_BINARY_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: _power,
+}
+_UNARY_OPS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+
+@lru_cache(maxsize=4096)
+def _parse_expression(expression: str) -> ast.expr:
+    """Parse a calculator expression, reusing the tree for repeated expressions."""
+    return ast.parse(expression, mode="eval").body
+
+
+def _evaluate(node: ast.expr):
+    """Evaluate a parsed arithmetic expression without eval()."""
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float, complex):
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+        return _BINARY_OPS[type(node.op)](_evaluate(node.left), _evaluate(node.right))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+        return _UNARY_OPS[type(node.op)](_evaluate(node.operand))
+    raise ValueError(f"Unsupported expression element: {type(node).__name__}")
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -53,6 +115,7 @@ async def lifespan(app: FastAPI):
     global agent, ingester
     
     print("🚀 Initializing AI Agent...")
+    app.state.pool = ThreadPoolExecutor(max_workers=BLOCKING_POOL_SIZE)
     agent = Agent(
         name="JanoBot",
         model="gpt-3.5-turbo",
@@ -70,7 +133,7 @@ async def lifespan(app: FastAPI):
     def calculator(expression: str) -> str:
         """Basic calculator tool."""
         try:
-            result = eval(expression)
+            result = _evaluate(_parse_expression(expression))
             return str(result)
         except Exception as e:
             return f"Calculation error: {str(e)}"
@@ -100,12 +163,15 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     print("🛑 Shutting down AI Agent...")
+    agent.shutdown()
+    app.state.pool.shutdown(wait=False)
 
 
 app = FastAPI(
     title="AI Agent API",
     description="FastAPI backend for AI Agent with RAG and tool calling",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -117,6 +183,7 @@ async def root():
         "message": "AI Agent API is running",
         "endpoints": {
             "query": "/query",
+            "query_stream": "/query/stream",
             "status": "/status",
             "tools": "/tools",
             "ingest": "/ingest",
@@ -133,7 +200,7 @@ async def query(request: QueryRequest):
         raise HTTPException(status_code=500, detail="Agent not initialized")
     
     try:
-        response = agent.think(
+        response = await agent.think(
             query=request.query,
             max_iterations=request.max_iterations
         )
@@ -147,6 +214,26 @@ async def query(request: QueryRequest):
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@app.post("/query/stream")
+async def query_stream(request: QueryRequest):
+    """Process a query through the agent, streaming progress as server-sent events."""
+    if agent is None:
+        raise HTTPException(status_code=500, detail="Agent not initialized")
+    
+    async def event_stream():
+        try:
+            async for event in agent.think_stream(
+                query=request.query,
+                max_iterations=request.max_iterations
+            ):
+                yield f"event: {event['event']}\ndata: {orjson.dumps(event).decode()}\n\n"
+        except Exception as e:
+            error = orjson.dumps({"event": "error", "detail": str(e)}).decode()
+            yield f"event: error\ndata: {error}\n\n"
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 @app.get("/status")
 async def get_status():
     """Get agent status."""
@@ -175,7 +262,11 @@ async def call_tool(request: ToolCallRequest):
         raise HTTPException(status_code=500, detail="Agent not initialized")
     
     try:
-        result = agent.execute_tool(request.tool_name, **request.parameters)
+        result = await run_blocking(
+            agent.execute_tool,
+            request.tool_name,
+            **request.parameters
+        )
         return {
             "tool": request.tool_name,
             "result": result,
@@ -192,7 +283,8 @@ async def ingest_document(request: DocumentIngestionRequest):
         raise HTTPException(status_code=500, detail="Ingester not initialized")
     
     try:
-        doc_count = ingester.ingest_file(
+        doc_count = await run_blocking(
+            ingester.ingest_file,
             file_path=request.file_path,
             chunk=request.chunk
         )
@@ -268,10 +360,14 @@ async def health_check():
 
 if __name__ == "__main__":
     # Run the server
+    # Each worker process holds its own agent, memory and vector store;
+    # loop="auto" picks uvloop where it is installed (not on Windows)
     uvicorn.run(
-        app,
+        "main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        loop="auto",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
         log_level="info"
     )
@@ -1,7 +1,9 @@
 """Memory management system for maintaining conversation history and context."""
 
-from typing import List, Dict, Any
-from datetime import datetime
+import sys
+import time
+from itertools import islice
+from typing import List, Dict, Any, Optional
 from collections import deque
 
 
@@ -10,40 +12,78 @@ class ConversationMemory:
     
     def __init__(self, max_history: int = 10):
         """Initialize memory with a maximum history size."""
-        self.history: deque = deque(maxlen=max_history)
         self.max_history = max_history
+        
+        # One bounded column per message field instead of a dict per message
+        self._roles: deque = deque(maxlen=max_history)
+        self._contents: deque = deque(maxlen=max_history)
+        self._timestamps_ns: deque = deque(maxlen=max_history)
+        self._metadatas: deque = deque(maxlen=max_history)
+        
+        # Formatted context lines kept in step with history
+        self._formatted: deque = deque(maxlen=max_history)
+        self._context_cache: Optional[str] = None
+    
+    @property
+    def history(self) -> List[Dict[str, Any]]:
+        """All stored messages as dictionaries."""
+        return self.get_history()
     
     def add_message(self, role: str, content: str, metadata: Dict[str, Any] = None):
         """Add a message to memory."""
-        message = {
-            "role": role,
-            "content": content,
-            "timestamp": datetime.now().isoformat(),
-            "metadata": metadata or {}
-        }
-        self.history.append(message)
+        # sys.intern only accepts exact str; subclasses such as str Enums are kept as given
+        if type(role) is str:
+            role = sys.intern(role)
+        self._roles.append(role)
+        self._contents.append(content)
+        self._timestamps_ns.append(time.time_ns())
+        self._metadatas.append(metadata or {})
+        self._formatted.append(f"{role.upper()}: {content}")
+        self._context_cache = None
     
     def get_history(self, num_messages: int = None) -> List[Dict[str, Any]]:
         """Retrieve conversation history."""
-        if num_messages is None:
-            return list(self.history)
-        return list(self.history)[-num_messages:]
+        # Timestamps are only formatted here, so defer the datetime import
+        from datetime import datetime
+        
+        # Same start index as list[-num_messages:], so only the returned messages are built
+        start = 0
+        if num_messages is not None:
+            start = range(len(self._roles))[-num_messages:].start
+        
+        columns = zip(self._roles, self._contents, self._timestamps_ns, self._metadatas)
+        return [
+            {
+                "role": role,
+                "content": content,
+                # Integer arithmetic truncates to microseconds like datetime.now() did
+                "timestamp": datetime.fromtimestamp(timestamp_ns // 1_000_000_000).replace(
+                    microsecond=timestamp_ns // 1000 % 1_000_000
+                ).isoformat(),
+                "metadata": metadata
+            }
+            for role, content, timestamp_ns, metadata in islice(columns, start, None)
+        ]
     
     def get_context(self) -> str:
         """Format history as context for the model."""
-        context = []
-        for msg in self.history:
-            context.append(f"{msg['role'].upper()}: {msg['content']}")
-        return "\n".join(context)
+        if self._context_cache is None:
+            self._context_cache = "\n".join(self._formatted)
+        return self._context_cache
     
     def clear(self):
         """Clear all history."""
-        self.history.clear()
+        self._roles.clear()
+        self._contents.clear()
+        self._timestamps_ns.clear()
+        self._metadatas.clear()
+        self._formatted.clear()
+        self._context_cache = None
     
     def summary_stats(self) -> Dict[str, Any]:
         """Get statistics about the conversation."""
         return {
-            "total_messages": len(self.history),
-            "total_turns": len([m for m in self.history if m["role"] == "user"]),
+            "total_messages": len(self._roles),
+            "total_turns": self._roles.count("user"),
             "max_capacity": self.max_history
         }
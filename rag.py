@@ -1,47 +1,258 @@
 """RAG (Retrieval-Augmented Generation) pipeline for semantic search and retrieval."""
 
 import os
-from typing import List, Dict, Any, Optional
-import json
+import re
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import Executor
+from functools import lru_cache, partial
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+import orjson
+from numba import njit
+from datasketch import MinHash, MinHashLSH
+
+
+@njit(cache=True)
+def _jaccard_scores(tokens, offsets, query_tokens, num_query_terms):
+    """
+    Jaccard similarity of a query against every document.
+    Document term ids are stored back to back in tokens with row
+    boundaries in offsets; each row and query_tokens are sorted.
+    """
+    num_docs = len(offsets) - 1
+    scores = np.zeros(num_docs, dtype=np.float64)
+    for d in range(num_docs):
+        i = offsets[d]
+        end = offsets[d + 1]
+        j = 0
+        overlap = 0
+        while i < end and j < len(query_tokens):
+            if tokens[i] == query_tokens[j]:
+                overlap += 1
+                i += 1
+                j += 1
+            elif tokens[i] < query_tokens[j]:
+                i += 1
+            else:
+                j += 1
+        if overlap:
+            doc_len = offsets[d + 1] - offsets[d]
+            scores[d] = overlap / (doc_len + num_query_terms - overlap)
+    return scores
+
+
+# Word tokenizer shared by documents and queries; punctuation never joins a term
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _tokenize(text: str) -> List[str]:
+    """Lowercased word tokens of a text."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+@lru_cache(maxsize=4096)
+def _query_terms(query: str) -> frozenset:
+    """Lowercased term set of a query, shared by the cache and the store."""
+    return frozenset(_tokenize(query))
+
+
+# Set bits in every byte value, for Hamming distance over bit-packed embeddings
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+QUANTIZATIONS = ("fp32", "int8", "bin")
+
+
+def _select_top_k(candidates: np.ndarray, scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Best top_k candidates by score, ties broken by candidate order."""
+    # O(N) selection of the top_k before sorting only the survivors
+    if len(candidates) > top_k:
+        # Keep everything tied with the k-th best so ties resolve by insertion order
+        kth = np.partition(scores, -top_k)[-top_k]
+        keep = scores >= kth
+        candidates, scores = candidates[keep], scores[keep]
+    return candidates[np.lexsort((candidates, -scores))][:top_k]
 
 
 class VectorStore:
     """Simple in-memory vector store for document retrieval."""
     
-    def __init__(self):
+    def __init__(self, quantize: str = "fp32"):
+        if quantize not in QUANTIZATIONS:
+            raise ValueError(f"quantize must be one of {QUANTIZATIONS}, got '{quantize}'")
+        self.quantize = quantize
         self.documents: List[Dict[str, Any]] = []
-        self.embeddings: List[List[float]] = []
+        
+        # Embedding rows stored as float32, int8 with a per-row scale, or packed sign bits
+        self.embeddings: Optional[np.ndarray] = None
+        self._embedding_scales: np.ndarray = np.zeros(0, dtype=np.float32)
+        self._embedding_doc_ids: np.ndarray = np.zeros(0, dtype=np.int64)
+        self._embedding_dim = 0
+        
+        # Sorted term ids of every document, flattened CSR-style and extended lazily on search
+        self.vocab: Dict[str, int] = {}
+        self._pending_rows: List[List[int]] = []
+        self._tokens: np.ndarray = np.zeros(0, dtype=np.int32)
+        self._offsets: np.ndarray = np.zeros(1, dtype=np.int64)
+        
+        # Guards every mutation; searches snapshot the (replaced, never mutated) arrays under it
+        self._lock = threading.Lock()
     
     def add_document(self, content: str, metadata: Dict[str, Any] = None):
         """Add a document to the store."""
-        doc = {
-            "content": content,
-            "metadata": metadata or {},
-            "doc_id": len(self.documents)
-        }
-        self.documents.append(doc)
+        self.add_documents([content], [metadata])
+    
+    def add_documents(
+        self,
+        contents: List[str],
+        metadatas: List[Dict[str, Any]] = None,
+        embeddings: Optional[np.ndarray] = None
+    ):
+        """Add a batch of documents, and optionally their embeddings, to the store."""
+        if metadatas is None:
+            metadatas = [None] * len(contents)
+        if len(metadatas) != len(contents):
+            raise ValueError("contents and metadatas must have the same length")
+        
+        # In production, embed the whole batch here in a single request
+        term_sets = [set(_tokenize(content)) for content in contents]
+        
+        with self._lock:
+            if embeddings is not None:
+                self._add_embeddings(embeddings, len(self.documents), len(contents))
+            
+            for content, metadata, terms in zip(contents, metadatas, term_sets):
+                doc = {
+                    "content": content,
+                    "metadata": metadata or {},
+                    "doc_id": len(self.documents)
+                }
+                self.documents.append(doc)
+                self._pending_rows.append(
+                    sorted(self.vocab.setdefault(term, len(self.vocab)) for term in terms)
+                )
+    
+    def _quantize_rows(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Encode float rows in the store's format, returning codes and per-row scales."""
+        if self.quantize == "bin":
+            return np.packbits(vectors > 0, axis=1), np.ones(len(vectors), dtype=np.float32)
+        if self.quantize == "int8":
+            scales = np.abs(vectors).max(axis=1) / 127
+            scales[scales == 0] = 1
+            codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+            return codes, scales.astype(np.float32)
+        return vectors, np.ones(len(vectors), dtype=np.float32)
+    
+    def _add_embeddings(self, embeddings: np.ndarray, first_doc_id: int, count: int):
+        """Quantize and append embeddings for documents first_doc_id onwards."""
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != count:
+            raise ValueError("embeddings must be a 2-D array with one row per document")
+        if self._embedding_dim and vectors.shape[1] != self._embedding_dim:
+            raise ValueError(
+                f"embedding dimension {vectors.shape[1]} does not match {self._embedding_dim}"
+            )
+        self._embedding_dim = vectors.shape[1]
+        
+        codes, scales = self._quantize_rows(vectors)
+        if self.embeddings is None:
+            self.embeddings = codes
+        else:
+            self.embeddings = np.concatenate([self.embeddings, codes])
+        self._embedding_scales = np.concatenate([self._embedding_scales, scales])
+        self._embedding_doc_ids = np.concatenate([
+            self._embedding_doc_ids,
+            np.arange(first_doc_id, first_doc_id + count, dtype=np.int64)
+        ])
+    
+    def _embedding_scores(
+        self,
+        query_embedding: np.ndarray,
+        embeddings: np.ndarray,
+        embedding_scales: np.ndarray,
+        dim: int
+    ) -> np.ndarray:
+        """Similarity of a query embedding to every row of a stored embedding snapshot."""
+        query = np.asarray(query_embedding, dtype=np.float32).reshape(1, -1)
+        if query.shape[1] != dim:
+            raise ValueError(f"query dimension {query.shape[1]} does not match {dim}")
+        codes, scales = self._quantize_rows(query)
+        
+        if self.quantize == "bin":
+            # Fraction of matching sign bits: 1 - Hamming distance / dim
+            distance = _POPCOUNT[np.bitwise_xor(embeddings, codes)].sum(axis=1, dtype=np.int64)
+            return 1.0 - distance / dim
+        if self.quantize == "int8":
+            dots = embeddings.astype(np.int32) @ codes[0].astype(np.int32)
+            return dots * (embedding_scales * scales[0])
+        return embeddings @ codes[0]
+    
+    def search_by_embedding(self, query_embedding: np.ndarray, top_k: int = 5) -> List[Dict[str, Any]]:
+        """Search stored embeddings by dot-product (or sign-bit agreement for 'bin')."""
+        with self._lock:
+            embeddings = self.embeddings
+            embedding_scales = self._embedding_scales
+            embedding_doc_ids = self._embedding_doc_ids
+            dim = self._embedding_dim
+        if embeddings is None or top_k <= 0:
+            return []
+        
+        scores = self._embedding_scores(query_embedding, embeddings, embedding_scales, dim)
+        rows = _select_top_k(np.arange(len(scores)), scores, top_k)
+        return self._results(embedding_doc_ids[rows], scores[rows])
+    
+    def _results(self, doc_ids: np.ndarray, scores: np.ndarray) -> List[Dict[str, Any]]:
+        """Materialize search results for the selected documents."""
+        results = []
+        for idx, score in zip(doc_ids, scores):
+            doc = self.documents[idx]
+            results.append({
+                "doc_id": doc["doc_id"],
+                "content": doc["content"],
+                "metadata": doc["metadata"],
+                "score": float(score)
+            })
+        return results
+    
+    def _build_index(self):
+        """Append pending document rows to the flat token index. Caller holds the lock."""
+        if not self._pending_rows:
+            return
+        
+        lengths = np.fromiter(
+            (len(row) for row in self._pending_rows),
+            dtype=np.int64,
+            count=len(self._pending_rows)
+        )
+        tokens = np.fromiter(
+            (term_id for row in self._pending_rows for term_id in row),
+            dtype=np.int32,
+            count=int(lengths.sum())
+        )
+        self._tokens = np.concatenate([self._tokens, tokens])
+        self._offsets = np.concatenate([self._offsets, self._offsets[-1] + np.cumsum(lengths)])
+        self._pending_rows = []
     
     def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
         """Simple BM25-style search (mock implementation)."""
         # In production, this would use proper vector similarity
-        query_terms = set(query.lower().split())
-        results = []
+        query_terms = _query_terms(query)
+        with self._lock:
+            query_ids = [self.vocab[term] for term in query_terms if term in self.vocab]
+            if not query_ids or top_k <= 0:
+                return []
+            self._build_index()
+            tokens, offsets = self._tokens, self._offsets
         
-        for doc in self.documents:
-            doc_terms = set(doc["content"].lower().split())
-            overlap = len(query_terms & doc_terms)
-            
-            if overlap > 0:
-                results.append({
-                    "doc_id": doc["doc_id"],
-                    "content": doc["content"],
-                    "metadata": doc["metadata"],
-                    "score": overlap / len(query_terms | doc_terms)
-                })
-        
-        # Sort by relevance score
-        results.sort(key=lambda x: x["score"], reverse=True)
-        return results[:top_k]
+        # Scoring runs outside the lock on the snapshot; rows are only ever appended
+        query_tokens = np.array(sorted(query_ids), dtype=np.int32)
+        scores = _jaccard_scores(tokens, offsets, query_tokens, len(query_terms))
+        
+        candidates = np.flatnonzero(scores)
+        candidates = _select_top_k(candidates, scores[candidates], top_k)
+        return self._results(candidates, scores[candidates])
     
     def get_document(self, doc_id: int) -> Optional[Dict[str, Any]]:
         """Retrieve a specific document."""
@@ -50,30 +261,108 @@ class VectorStore:
         return None
 
 
+class SemanticCache:
+    """Cache of retrieved context keyed by exact and near-duplicate queries."""
+    
+    def __init__(self, threshold: float = 0.9, num_perm: int = 64, max_entries: int = 1024):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.max_entries = max_entries
+        # A cache miss looks up and then inserts the same query; build its MinHash once
+        self._minhash = lru_cache(maxsize=max_entries)(self._minhash_uncached)
+        # Retrievals run on worker threads; MinHashes are computed outside the lock
+        self._lock = threading.Lock()
+        self.clear()
+    
+    def clear(self):
+        """Drop all cached entries."""
+        with self._lock:
+            self._clear()
+    
+    def _clear(self):
+        """Drop all cached entries. Caller holds the lock."""
+        self._lsh = MinHashLSH(threshold=self.threshold, num_perm=self.num_perm)
+        self._exact: Dict[bytes, str] = {}
+        self._entries: Dict[str, Tuple[int, MinHash, str]] = {}
+    
+    @staticmethod
+    def _key(query: str, top_k: int) -> bytes:
+        """Digest identifying an exact query and top_k."""
+        return hashlib.blake2b(f"{top_k}\x00{query}".encode("utf-8")).digest()
+    
+    def _minhash_uncached(self, terms: frozenset) -> MinHash:
+        """MinHash signature of a query term set."""
+        m = MinHash(num_perm=self.num_perm)
+        for term in terms:
+            m.update(term.encode("utf-8"))
+        return m
+    
+    def get(self, query: str, top_k: int) -> Optional[str]:
+        """Return cached context for an identical or near-identical query."""
+        key = self._key(query, top_k)
+        context = self._exact.get(key)
+        if context is not None:
+            return context
+        
+        terms = _query_terms(query)
+        if not terms or not self._entries:
+            return None
+        
+        m = self._minhash(terms)
+        with self._lock:
+            candidates = [self._entries[c] for c in self._lsh.query(m)]
+        for cached_top_k, cached_m, context in candidates:
+            # LSH buckets are approximate; confirm the estimated similarity
+            if cached_top_k == top_k and m.jaccard(cached_m) >= self.threshold:
+                return context
+        return None
+    
+    def insert(self, query: str, top_k: int, context: str):
+        """Cache the context retrieved for a query."""
+        key = self._key(query, top_k)
+        terms = _query_terms(query)
+        m = self._minhash(terms) if terms else None
+        
+        with self._lock:
+            if len(self._exact) >= self.max_entries:
+                self._clear()
+            self._exact[key] = context
+            
+            lsh_key = key.hex()
+            if m is not None and lsh_key not in self._entries:
+                self._lsh.insert(lsh_key, m)
+                self._entries[lsh_key] = (top_k, m, context)
+
+
 class RAGPipeline:
     """RAG pipeline combining retrieval and generation."""
     
     def __init__(self, vector_store: VectorStore = None):
         self.vector_store = vector_store or VectorStore()
+        self.cache = SemanticCache()
+        self._cached_doc_count = 0
+        self._format_documents = lru_cache(maxsize=1024)(self._format_documents_uncached)
     
     def load_documents(self, file_path: str) -> int:
         """Load documents from a JSON file."""
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
         
-        with open(file_path, 'r', encoding='utf-8') as f:
-            docs = json.load(f)
+        with open(file_path, 'rb') as f:
+            docs = orjson.loads(f.read())
         
-        count = 0
+        contents, metadatas = [], []
         if isinstance(docs, list):
             for doc in docs:
                 content = doc.get("content", "") or doc.get("text", "")
                 metadata = {k: v for k, v in doc.items() if k not in ["content", "text"]}
                 if content:
-                    self.vector_store.add_document(content, metadata)
-                    count += 1
+                    contents.append(content)
+                    metadatas.append(metadata)
         
-        return count
+        if contents:
+            self.vector_store.add_documents(contents, metadatas)
+        return len(contents)
     
     def retrieve(self, query: str, top_k: int = 5) -> List[str]:
         """Retrieve relevant documents for a query."""
@@ -92,10 +381,29 @@ class RAGPipeline:
             context += f"\n{i}. {truncated}\n"
         return context
     
+    def _format_documents_uncached(self, doc_ids: Tuple[int, ...]) -> str:
+        """Format the documents with the given ids into context."""
+        return self.format_context([self.vector_store.documents[i]["content"] for i in doc_ids])
+    
     def augment_prompt(self, query: str, top_k: int = 5) -> str:
-        """Augment a query with retrieved context."""
-        documents = self.retrieve(query, top_k)
-        context = self.format_context(documents)
+        """
+        Augment a query with retrieved context.
+        Documents are ordered by doc_id rather than score so that queries
+        retrieving the same documents share a byte-identical prompt prefix.
+        """
+        # Cached context is only valid for the documents present when it was built
+        doc_count = len(self.vector_store.documents)
+        if doc_count != self._cached_doc_count:
+            self.cache.clear()
+            self._cached_doc_count = doc_count
+        
+        context = self.cache.get(query, top_k)
+        if context is None:
+            results = self.vector_store.search(query, top_k)
+            context = self._format_documents(tuple(sorted(r["doc_id"] for r in results)))
+            # Skip caching if documents were added while this search ran
+            if len(self.vector_store.documents) == doc_count:
+                self.cache.insert(query, top_k, context)
         
         augmented = f"""Use the following context to answer the question:
 
@@ -106,6 +414,19 @@ Question: {query}
 Answer:"""
         return augmented
     
+    async def augment_prompt_async(
+        self,
+        query: str,
+        top_k: int = 5,
+        executor: Optional[Executor] = None
+    ) -> str:
+        """Augment a query on a worker thread so retrieval can overlap other work."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            executor,
+            partial(self.augment_prompt, query, top_k)
+        )
+    
     def get_stats(self) -> Dict[str, Any]:
         """Get statistics about the vector store."""
         return {
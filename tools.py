@@ -1,6 +1,6 @@
 """Tool calling system for agent interactions."""
 
-from typing import List, Dict, Any, Callable
+from typing import List, Dict, Any, Callable, Optional
 from enum import Enum
 
 
@@ -49,10 +49,16 @@ class ToolRegistry:
     
     def __init__(self):
         self.tools: Dict[str, Tool] = {}
+        
+        # Bumped on every registration; invalidates the formatted tool context
+        self._tools_version: int = 0
+        self._tools_context_cache: Optional[str] = None
+        self._tools_context_version: int = -1
     
     def register(self, tool: Tool) -> None:
         """Register a tool."""
         self.tools[tool.name] = tool
+        self._tools_version += 1
     
     def get_tool(self, name: str) -> Tool:
         """Retrieve a tool by name."""
@@ -71,7 +77,9 @@ class ToolRegistry:
     
     def get_tools_for_context(self) -> str:
         """Format tools for inclusion in model context."""
-        tools_str = "Available Tools:\n"
-        for tool in self.tools.values():
-            tools_str += f"\n- {tool.name}: {tool.description}\n"
-        return tools_str
+        if self._tools_context_version != self._tools_version:
+            self._tools_context_cache = "Available Tools:\n" + "".join(
+                f"\n- {tool.name}: {tool.description}\n" for tool in self.tools.values()
+            )
+            self._tools_context_version = self._tools_version
+        return self._tools_context_cache